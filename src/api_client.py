@@ -1,11 +1,78 @@
 import os
+import copy
+from functools import lru_cache, partial
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from utils import validate_location_input, encode_location
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils import validate_location_input
+
+# Prefer orjson for parsing API responses when it is installed; fall back to the stdlib
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
 
 # Retrieve API Key and Base URL from environment variables
 API_KEY = os.getenv("OPENWEATHER_API_KEY")  # Ensure this is set in your environment
-BASE_URL = "http://api.openweathermap.org/geo/1.0/"
+BASE_URL = "https://api.openweathermap.org/geo/1.0/"
+DIRECT_URL = BASE_URL + "direct"  # Endpoint for city/state lookups
+ZIP_URL = BASE_URL + "zip"  # Endpoint for ZIP code lookups
 TIMEOUT = 10  # Timeout duration in seconds
+POOL_SIZE = 32  # Maximum number of concurrent connections (and CLI worker threads)
+CACHE_SIZE = 1024  # Maximum number of lookups remembered per endpoint
+NAME_RESULT_LIMIT = 5  # Maximum matches returned for a city/state lookup (API maximum is 5)
+
+# Shared HTTP session so repeated lookups reuse pooled keep-alive connections
+_SESSION = requests.Session()
+# Retry throttled (429) and transient server errors with exponential backoff. The final
+# response is returned rather than raised so `raise_for_status` reports it as before.
+# Connection failures and timeouts are not retried, so a stalled endpoint still fails
+# after a single `TIMEOUT`.
+_RETRY = Retry(
+    total=5,
+    connect=0,
+    read=0,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset(["GET"]),
+    raise_on_status=False,
+)
+_ADAPTER = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=_RETRY)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.params = {"appid": API_KEY}  # Sent with every request made through the session
+
+def _unauthorized(_):
+    """Raise the error reported when the API rejects the API key (HTTP 401)."""
+    raise RuntimeError("Unauthorized access: Check your API key.") from None
+
+def _zip_not_found(zip_code):
+    """Return the error dictionary reported when a ZIP code has no results (HTTP 404)."""
+    return {"error": f"No results found for ZIP code: {zip_code}"}
+
+# Handlers for HTTP error statuses, keyed by status code. Each is called with the lookup
+# value and either returns the fetch result or raises; other statuses raise a generic error.
+_NAME_STATUS_HANDLERS = {401: _unauthorized}
+_ZIP_STATUS_HANDLERS = {401: _unauthorized, 404: _zip_not_found}
+
+def _name_query(location):
+    """
+    Return the API query (and cache key) for a validated location.
+
+    ASCII input is lowercased so case-only variants share one request; other input is sent
+    unchanged, since lowercasing can alter it (e.g., "İ" becomes "i" plus a combining dot).
+    """
+    return location.lower() if location.isascii() else location
+
+def _validate_name(location):
+    """
+    Validate and normalize a city/state location, raising ValueError if it is invalid.
+    """
+    try:
+        return validate_location_input(location)
+    except ValueError as ve:
+        raise ValueError(f"Invalid location input: {ve}") from None
 
 def fetch_coordinates_by_name(location):
     """
@@ -15,7 +82,8 @@ def fetch_coordinates_by_name(location):
         location (str): The city and state in the format "City, State" (e.g., "Madison, WI").
 
     Returns:
-        list[dict]: A list of dictionaries containing latitude, longitude, and other location details.
+        list[dict]: A list of up to `NAME_RESULT_LIMIT` dictionaries containing latitude, longitude,
+                    and other location details.
                     If no results are found, returns a list with an error dictionary.
 
     Raises:
@@ -23,39 +91,54 @@ def fetch_coordinates_by_name(location):
         RuntimeError: If the API request fails due to network issues or invalid API key.
         TimeoutError: If the API request times out.
     """
-    # Validate and encode the input location
-    try:
-        location = validate_location_input(location)
-        encoded_location = encode_location(location)
-    except ValueError as ve:
-        raise ValueError(f"Invalid location input: {ve}") from None
+    # Validate the input location
+    location = _validate_name(location)
 
+    # Look up the normalized query so spacing and case variants share a cache entry
+    data = _fetch_name_cached(_name_query(location))
+
+    # Handle cases where no data is returned
+    if not data:
+        return [{"error": f"No results found for location: {location}"}]
+
+    # Return a copy so callers can't modify the cached result
+    return copy.deepcopy(data)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _fetch_name_cached(location):
+    """
+    Query the OpenWeather direct geocoding endpoint for a validated, normalized location.
+
+    Results are memoized; errors are raised and therefore never cached.
+    """
     try:
         # Make a GET request to the OpenWeather API for geolocation data with a timeout
-        response = requests.get(
-            f"{BASE_URL}direct",
-            params={"q": encoded_location, "appid": API_KEY},
+        response = _SESSION.get(
+            DIRECT_URL,
+            params={"q": location, "limit": NAME_RESULT_LIMIT},  # requests URL-encodes params
             timeout=TIMEOUT
         )
         response.raise_for_status()  # Raise an error for HTTP status codes >= 400
     except requests.exceptions.Timeout:
         raise TimeoutError("The request timed out. Please try again later.") from None
     except requests.exceptions.HTTPError as http_err:
-        if response.status_code == 401:
-            raise RuntimeError("Unauthorized access: Check your API key.") from None
-        else:
-            raise RuntimeError(f"HTTP error occurred: {http_err}") from None
+        handler = _NAME_STATUS_HANDLERS.get(response.status_code)
+        if handler:
+            return handler(location)
+        raise RuntimeError(f"HTTP error occurred: {http_err}") from None
     except requests.exceptions.RequestException as req_err:
         raise RuntimeError(f"An error occurred during the request: {req_err}") from None
 
     # Parse the JSON response
-    data = response.json()
-
-    # Handle cases where no data is returned
-    if not data:
-        return [{"error": f"No results found for location: {location}"}]
+    return _json_loads(response.content)
 
-    return data
+def _validate_zip(zip_code):
+    """
+    Validate a ZIP code, raising ValueError unless it is a 5-digit number.
+    """
+    if len(zip_code) != 5 or not zip_code.isdigit():
+        raise ValueError("Invalid ZIP code. ZIP code must be a 5-digit number.")
+    return zip_code
 
 def fetch_coordinates_by_zip(zip_code):
     """
@@ -74,30 +157,135 @@ def fetch_coordinates_by_zip(zip_code):
         TimeoutError: If the API request times out.
     """
     # Validate the input ZIP code
-    if not zip_code.isdigit() or len(zip_code) != 5:
-        raise ValueError("Invalid ZIP code. ZIP code must be a 5-digit number.")
+    _validate_zip(zip_code)
+
+    # Return a copy so callers can't modify the cached result
+    return copy.deepcopy(_fetch_zip_cached(zip_code))
 
+@lru_cache(maxsize=CACHE_SIZE)
+def _fetch_zip_cached(zip_code):
+    """
+    Query the OpenWeather ZIP geocoding endpoint for a validated ZIP code.
+
+    Results (including the "no results" error dictionary) are memoized; raised errors are not.
+    """
     try:
         # Make a GET request to the OpenWeather API for ZIP code data with a timeout
-        response = requests.get(
-            f"{BASE_URL}zip",
-            params={"zip": zip_code, "appid": API_KEY},
+        response = _SESSION.get(
+            ZIP_URL,
+            params={"zip": zip_code},
             timeout=TIMEOUT
         )
         response.raise_for_status()  # Raise an error for HTTP status codes >= 400
     except requests.exceptions.Timeout:
         raise TimeoutError("The request timed out. Please try again later.") from None
     except requests.exceptions.HTTPError as http_err:
-        if response.status_code == 404:
-            return {"error": f"No results found for ZIP code: {zip_code}"}
-        elif response.status_code == 401:
-            raise RuntimeError("Unauthorized access: Check your API key.") from None
-        else:
-            raise RuntimeError(f"HTTP error occurred: {http_err}") from None
+        handler = _ZIP_STATUS_HANDLERS.get(response.status_code)
+        if handler:
+            return handler(zip_code)
+        raise RuntimeError(f"HTTP error occurred: {http_err}") from None
     except requests.exceptions.RequestException as req_err:
         raise RuntimeError(f"An error occurred during the request: {req_err}") from None
 
     # Parse the JSON response
-    data = response.json()
+    return _json_loads(response.content)
+
+def fetch_coordinates(location):
+    """
+    Fetch geolocation coordinates for a single location, choosing the ZIP code or
+    city/state lookup based on the input.
+
+    Args:
+        location (str): A city/state combination (e.g., "Madison, WI") or a ZIP code (e.g., "53703").
+
+    Returns:
+        list[dict] | dict: The result of `fetch_coordinates_by_zip` for all-digit inputs,
+                           otherwise the result of `fetch_coordinates_by_name`.
+
+    Raises:
+        ValueError, RuntimeError, TimeoutError: As raised by the underlying fetch function.
+    """
+    if location.isdigit():  # Treat all-digit input as a ZIP code
+        return fetch_coordinates_by_zip(location)
+    return fetch_coordinates_by_name(location)
+
+def clear_cache():
+    """
+    Discard all memoized lookups so subsequent calls query the API again.
+    """
+    _fetch_name_cached.cache_clear()
+    _fetch_zip_cached.cache_clear()
 
-    return data
+def _fetch_or_error(fetch, key):
+    """
+    Call `fetch(key)`, returning a `(data, error)` pair instead of raising on a failed lookup.
+    """
+    try:
+        return fetch(key), None
+    except (RuntimeError, TimeoutError) as err:
+        return None, err
+
+def fetch_many(locations):
+    """
+    Fetch geolocation coordinates for several locations concurrently.
+
+    The lookups are IO-bound, so they are dispatched over a thread pool that shares the
+    module's pooled HTTP session; the number of workers never exceeds `POOL_SIZE`.
+    Inputs are validated once and split into ZIP code and city/state batches. Duplicate
+    locations, including city/state inputs that differ only in spacing or ASCII case, are
+    fetched only once with their result reused. A failed lookup does not affect the others.
+
+    Args:
+        locations (list[str]): City/state combinations and/or ZIP codes.
+
+    Returns:
+        list: The result for each location, in the same order as `locations`. If a lookup
+              raises ValueError, RuntimeError or TimeoutError, its entry is a dictionary
+              with an "error" message instead.
+    """
+    if not locations:
+        return []
+
+    # Validate and classify each distinct location once, so every batch maps a single
+    # cached fetch function
+    zip_codes, names, errors = {}, {}, {}
+    for location in dict.fromkeys(locations):
+        try:
+            if location.isdigit():
+                zip_codes[location] = _validate_zip(location)
+            else:
+                names[location] = _validate_name(location)
+        except ValueError as err:
+            errors[location] = err
+
+    # Group city/state inputs by normalized query, so formatting-only variants (spacing,
+    # ASCII case) are requested once even when their lookups would otherwise run concurrently
+    queries = {location: _name_query(name) for location, name in names.items()}
+    unique_queries = list(dict.fromkeys(queries.values()))
+
+    fetched_zips, fetched_names = {}, {}
+    workers = min(POOL_SIZE, len(zip_codes) + len(unique_queries))
+    if workers:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            zip_results = executor.map(partial(_fetch_or_error, _fetch_zip_cached), zip_codes)
+            name_results = executor.map(partial(_fetch_or_error, _fetch_name_cached), unique_queries)
+            fetched_zips = dict(zip(zip_codes, zip_results))
+            fetched_names = dict(zip(unique_queries, name_results))
+
+    # Build each position's result, copying cached data once so no two entries (or the
+    # cache) share an object
+    results = []
+    for location in locations:
+        if location in errors:
+            data, err = None, errors[location]
+        elif location in zip_codes:
+            data, err = fetched_zips[location]
+        else:
+            data, err = fetched_names[queries[location]]
+        if err is not None:
+            results.append({"error": f"Lookup failed for location {location}: {err}"})
+        elif location in names and not data:
+            results.append([{"error": f"No results found for location: {names[location]}"}])
+        else:
+            results.append(copy.deepcopy(data))
+    return results
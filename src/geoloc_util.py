@@ -1,8 +1,7 @@
 import argparse  # Library for parsing command-line arguments
-from api_client import (
-    fetch_coordinates_by_name,
-    fetch_coordinates_by_zip,
-)  # Functions to fetch geolocation data
+import json  # Library for serializing the results report
+import sys  # Provides access to standard output
+from api_client import fetch_many  # Fetches geolocation data for several locations
 
 
 def main():
@@ -11,7 +10,7 @@ def main():
 
     This script allows the user to input a list of locations (either city/state combinations
     or ZIP codes) via the command line. It then retrieves geolocation data (latitude, longitude, etc.)
-    for each location using the appropriate API call and prints the results.
+    for each location using the appropriate API call and prints the results as a JSON report.
 
     Example Usage:
         python geoloc_util.py --locations "Madison, WI" "53703" "Chicago, IL" "60601"
@@ -19,8 +18,9 @@ def main():
     Functionality:
     - Accepts multiple location inputs as command-line arguments.
     - Determines whether each input is a city/state combination or a ZIP code.
-    - Fetches geolocation data for each input using the appropriate API function.
-    - Prints the results for each location to the console.
+    - Fetches geolocation data for each input concurrently using the appropriate API function.
+    - Writes a single JSON array of {"location", "data"} objects to standard output; a location
+      whose lookup fails is reported with an {"error": ...} entry as its data.
     """
     # Create a parser for command-line arguments
     parser = argparse.ArgumentParser(description="Geolocation Utility")
@@ -36,21 +36,15 @@ def main():
     # Parse the command-line arguments
     args = parser.parse_args()
 
-    # Loop through the provided locations and determine how to fetch their data
-    for location in args.locations:
-        if (
-            location.isdigit()
-        ):  # Check if the input is a ZIP code (contains only digits)
-            data = fetch_coordinates_by_zip(
-                location
-            )  # Fetch data using the ZIP code API
-        else:  # Otherwise, treat the input as a city/state combination
-            data = fetch_coordinates_by_name(
-                location
-            )  # Fetch data using the city/state API
-
-        # Print the results for the current location
-        print(f"Location: {location}, Data: {data}")
+    # Fetch all locations concurrently; results come back in input order
+    results = fetch_many(args.locations)
+
+    # Collect the results (including per-location errors) and write them as a single JSON report
+    report = [
+        {"location": location, "data": data}
+        for location, data in zip(args.locations, results)
+    ]
+    sys.stdout.write(json.dumps(report, ensure_ascii=False) + "\n")
 
 
 if __name__ == "__main__":
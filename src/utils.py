@@ -1,16 +1,26 @@
 import re  # Module for regular expression operations
-from urllib.parse import quote  # Module for URL encoding
+
+# Allowed location characters, compiled once at import time
+_LOCATION_RE = re.compile(r"^[\w\s,.-]+$", re.UNICODE)
+# ASCII equivalent of the pattern above, used to skip the regex engine for ASCII input
+_ASCII_ALLOWED = frozenset(c for c in map(chr, range(128)) if _LOCATION_RE.match(c))
+# Patterns used to normalize whitespace and comma spacing in valid locations
+_WHITESPACE_RE = re.compile(r"\s+")
+_COMMA_RE = re.compile(r" ?, ?")
 
 
 def validate_location_input(location):
     """
-    Validates the input location string to ensure it meets the required format.
+    Validates the input location string to ensure it meets the required format, and
+    normalizes its spacing so formatting-only variants compare equal.
 
     Args:
         location (str): The location string provided by the user (e.g., "Madison, WI").
 
     Returns:
-        str: The validated location string if it passes all checks.
+        str: The validated location with surrounding whitespace removed, internal whitespace
+             collapsed to single spaces, and commas followed by exactly one space
+             (e.g., " Madison ,WI" -> "Madison, WI").
 
     Raises:
         ValueError: If the location string is empty or contains invalid characters.
@@ -23,28 +33,15 @@ def validate_location_input(location):
         raise ValueError(
             "Location input cannot be empty."
         )  # Raise error if input is empty
-    if not re.match(r"^[\w\s,.-]+$", location, re.UNICODE):
+    if location.isascii():
+        valid = _ASCII_ALLOWED.issuperset(location)  # Fast path for plain ASCII input
+    else:
+        valid = _LOCATION_RE.match(location) is not None
+    if not valid:
         raise ValueError(
             "Location contains invalid characters."
         )  # Raise error for invalid characters
-    return location  # Return the validated location
-
-
-def encode_location(location):
-    """
-    Encodes the location string to make it safe for use in a URL.
-
-    Args:
-        location (str): The location string to be encoded.
-
-    Returns:
-        str: The URL-encoded location string.
-
-    Example:
-    - Input: "Madison, WI"
-    - Output: "Madison%2C%20WI"
-
-    Notes:
-    - Uses the `quote` function to replace special characters with their URL-safe equivalents.
-    """
-    return quote(location, safe="")  # Encode the location string for safe use in URLs
+    # Normalize spacing: collapse whitespace runs, then canonicalize comma separators
+    location = _WHITESPACE_RE.sub(" ", location)
+    location = _COMMA_RE.sub(", ", location).strip()
+    return location  # Return the validated, normalized location
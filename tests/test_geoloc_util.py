@@ -1,83 +1,37 @@
+import importlib.util
+import json
 import os
 import sys
-import requests
+import time
 import pytest
 import responses
 
 # Add the `src` directory to the Python path to ensure modules can be imported
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
 
-# Import utility functions for validation and encoding
-from utils import validate_location_input, encode_location
-
-# Base URL for the OpenWeather Geocoding API
-BASE_URL = "http://api.openweathermap.org/geo/1.0/"
-# Fetch the API Key securely from environment variables
-API_KEY = os.getenv("OPENWEATHER_API_KEY")  # Ensure this is set in your environment
-
-
-def fetch_coordinates_by_name(location):
+# Import the API client functions under test
+from api_client import (
+    _SESSION,
+    DIRECT_URL,
+    ZIP_URL,
+    clear_cache,
+    fetch_coordinates,
+    fetch_coordinates_by_name,
+    fetch_coordinates_by_zip,
+    fetch_many,
+)
+from utils import _LOCATION_RE, validate_location_input
+import geoloc_util
+
+
+@pytest.fixture(autouse=True)
+def _clear_api_cache():
     """
-    Fetch geographical coordinates (latitude and longitude) by city and state.
-
-    Args:
-        location (str): The city and state input in "City, State" format.
-
-    Returns:
-        list: A list of dictionaries containing latitude, longitude, and additional location details.
-            If no results are found, returns a list with an error dictionary.
+    Clear memoized API lookups so each test sees only its own mocked responses.
     """
-    # Validate the input location to ensure it meets the expected format
-    location = validate_location_input(location)
-    # Encode the location to make it URL-safe
-    encoded_location = encode_location(location)
-    try:
-        # Make a GET request to the API with a timeout
-        response = requests.get(
-            f"{BASE_URL}direct",
-            params={"q": encoded_location, "appid": API_KEY},
-            timeout=10,  # Set a timeout to avoid hanging requests
-        )
-        response.raise_for_status()  # Raise an error for HTTP status codes >= 400
-        data = response.json()  # Parse the JSON response
-        # Return an error dictionary if no data is found
-        if not data:
-            return [{"error": f"No results found for location: {location}"}]
-        return data
-    except requests.exceptions.HTTPError as e:
-        if response.status_code == 401:
-            return [{"error": "Unauthorized: Invalid API Key or insufficient permissions."}]
-        raise e
-
-
-def fetch_coordinates_by_zip(zip_code):
-    """
-    Fetch geographical coordinates by ZIP code.
-
-    Args:
-        zip_code (str): ZIP code.
-
-    Returns:
-        dict: A dictionary containing latitude, longitude, and location details, or an error message.
-    """
-    if not zip_code.isdigit() or len(zip_code) != 5:
-        raise ValueError("Invalid ZIP code. ZIP code must be a 5-digit number.")
-
-    try:
-        response = requests.get(
-            f"{BASE_URL}zip",
-            params={"zip": zip_code, "appid": API_KEY},
-            timeout=10
-        )
-        response.raise_for_status()
-    except requests.exceptions.HTTPError as e:
-        if response.status_code == 404:  # Handle 404 error gracefully
-            return {"error": f"No results found for ZIP code: {zip_code}"}
-        elif response.status_code == 401:
-            return {"error": "Unauthorized: Invalid API Key or insufficient permissions."}
-        raise e  # Re-raise other HTTP errors
-
-    return response.json()
+    clear_cache()
+    yield
+    clear_cache()
 
 
 # Test Cases
@@ -92,7 +46,7 @@ def test_fetch_coordinates_by_name_invalid():
     """
     responses.add(
         responses.GET,
-        f"{BASE_URL}direct",
+        DIRECT_URL,
         json=[],
         status=200,
     )
@@ -129,7 +83,7 @@ def test_fetch_coordinates_by_zip_invalid():
     """
     responses.add(
         responses.GET,
-        f"{BASE_URL}zip",
+        ZIP_URL,
         json={"error": "No results found for ZIP code: 00000"},
         status=404,
     )
@@ -170,7 +124,7 @@ def test_fetch_coordinates_by_name_accented():
     """
     responses.add(
         responses.GET,
-        f"{BASE_URL}direct",
+        DIRECT_URL,
         json=[{"lat": 45.5017, "lon": -73.5673, "name": "Montréal", "country": "CA"}],
         status=200,
     )
@@ -182,4 +136,346 @@ def test_fetch_coordinates_by_name_accented():
     if result[0]["lat"] != 45.5017 or result[0]["lon"] != -73.5673:
         raise AssertionError(
             f"Expected coordinates (45.5017, -73.5673), got ({result[0]['lat']}, {result[0]['lon']})"
-        )
\ No newline at end of file
+        )
+
+
+def test_validate_location_input_normalizes_spacing():
+    """
+    Test that location validation returns a canonical spacing of the input.
+
+    Ensures that:
+    - Surrounding whitespace is removed and internal whitespace is collapsed.
+    - Commas are followed by exactly one space, regardless of the input spacing.
+    """
+    assert validate_location_input("  Madison ,WI ") == "Madison, WI"
+    assert validate_location_input("St.  Louis,\tMO") == "St. Louis, MO"
+    assert validate_location_input("Montréal, QC") == "Montréal, QC"
+
+
+def test_validate_location_input_ascii_fast_path_matches_regex():
+    """
+    Test that the ASCII fast path accepts exactly the characters the location regex accepts.
+
+    Ensures that:
+    - Every ASCII character is accepted if and only if `_LOCATION_RE` matches it.
+    - Mixed inputs (ASCII and non-ASCII) follow the same rules.
+    """
+    for code in range(128):
+        char = "a" + chr(code)  # Prefix keeps whitespace-only input out of the empty check
+        expected = _LOCATION_RE.match(char) is not None
+        try:
+            validate_location_input(char)
+            accepted = True
+        except ValueError:
+            accepted = False
+        assert accepted == expected, f"Mismatch for {chr(code)!r}: accepted={accepted}"
+
+    assert validate_location_input("Madison_WI") == "Madison_WI"
+    assert validate_location_input("Madison\tWI") == "Madison WI"
+    with pytest.raises(ValueError):
+        validate_location_input("Madison@WI")
+    with pytest.raises(ValueError):
+        validate_location_input("Montréal@")
+
+
+@responses.activate
+def test_fetch_coordinates_by_name_cached():
+    """
+    Test that repeated lookups of the same location are served from the cache.
+
+    Ensures that:
+    - Spacing-only variants (surrounding whitespace, comma spacing) share one API request.
+    - Cached calls return the same data as the original request.
+    """
+    responses.add(
+        responses.GET,
+        DIRECT_URL,
+        json=[{"lat": 43.0731, "lon": -89.4012, "name": "Madison", "state": "WI", "country": "US"}],
+        status=200,
+    )
+    first = fetch_coordinates_by_name("Madison, WI")
+    second = fetch_coordinates_by_name("  Madison ,WI ")
+    assert first == second
+    assert len(responses.calls) == 1, f"Expected 1 API call, got {len(responses.calls)}"
+
+
+@responses.activate
+def test_fetch_coordinates_by_name_case_variants_cached():
+    """
+    Test that ASCII locations differing only in case share one API request.
+    """
+    responses.add(
+        responses.GET,
+        DIRECT_URL,
+        json=[{"lat": 43.0731, "lon": -89.4012, "name": "Madison", "state": "WI", "country": "US"}],
+        status=200,
+    )
+    first = fetch_coordinates_by_name("Madison, WI")
+    second = fetch_coordinates_by_name("madison, wi")
+    assert first == second
+    assert len(responses.calls) == 1, f"Expected 1 API call, got {len(responses.calls)}"
+
+
+@responses.activate
+def test_fetch_coordinates_by_name_preserves_case():
+    """
+    Test that the location is sent to the API with its original case.
+
+    Ensures that:
+    - Non-ASCII names are not altered by case conversion (e.g., "İstanbul").
+    """
+    responses.add(
+        responses.GET,
+        DIRECT_URL,
+        json=[{"lat": 41.0082, "lon": 28.9784, "name": "Istanbul", "country": "TR"}],
+        status=200,
+        match=[responses.matchers.query_param_matcher({"q": "İstanbul, TR"}, strict_match=False)],
+    )
+    result = fetch_coordinates_by_name("İstanbul, TR")
+    assert result[0]["name"] == "Istanbul", f"Unexpected result: {result}"
+
+
+@responses.activate
+def test_fetch_coordinates_cached_result_not_shared():
+    """
+    Test that modifying a returned result does not affect later cached lookups.
+
+    Ensures that:
+    - Each call returns its own copy of the cached data.
+    - Duplicate locations in a batch get independent result objects.
+    """
+    responses.add(
+        responses.GET,
+        DIRECT_URL,
+        json=[{"lat": 43.0731, "lon": -89.4012, "name": "Madison", "state": "WI", "country": "US"}],
+        status=200,
+    )
+    first = fetch_coordinates_by_name("Madison, WI")
+    first[0]["lat"] = 999
+    second = fetch_coordinates_by_name("Madison, WI")
+    assert second[0]["lat"] == 43.0731, f"Cached result was modified: {second}"
+
+    batch = fetch_many(["Madison, WI", "Madison, WI"])
+    batch[0][0]["lat"] = 999
+    assert batch[1][0]["lat"] == 43.0731, f"Duplicate results share an object: {batch}"
+    assert len(responses.calls) == 1, f"Expected 1 API call, got {len(responses.calls)}"
+
+
+@responses.activate
+def test_fetch_coordinates_dispatch():
+    """
+    Test that fetch_coordinates chooses the ZIP code or city/state lookup based on the input.
+
+    Ensures that:
+    - All-digit input is looked up via the ZIP code endpoint.
+    - Other input is looked up via the city/state endpoint.
+    """
+    name_data = [{"lat": 41.8781, "lon": -87.6298, "name": "Chicago", "state": "IL", "country": "US"}]
+    zip_data = {"zip": "53703", "lat": 43.0731, "lon": -89.4012, "name": "Madison", "country": "US"}
+    responses.add(responses.GET, DIRECT_URL, json=name_data, status=200)
+    responses.add(responses.GET, ZIP_URL, json=zip_data, status=200)
+
+    assert fetch_coordinates("53703") == zip_data
+    assert fetch_coordinates("Chicago, IL") == name_data
+    with pytest.raises(ValueError):
+        fetch_coordinates("1234")
+
+
+@responses.activate
+def test_fetch_multiple_locations_formatting_variants():
+    """
+    Test that formatting-only variants in one batch share a single API request.
+
+    Ensures that:
+    - Variants are coalesced before dispatch, even when lookups overlap in time.
+    - Every input position still receives the result.
+    """
+    name_data = [{"lat": 43.0731, "lon": -89.4012, "name": "Madison", "state": "WI", "country": "US"}]
+
+    def slow_response(request):
+        time.sleep(0.05)  # Simulate network latency so concurrent lookups overlap
+        return 200, {}, json.dumps(name_data)
+
+    responses.add_callback(responses.GET, DIRECT_URL, callback=slow_response)
+
+    result = fetch_many(["Madison, WI", "Madison,WI", " Madison , WI", "madison, wi"])
+    assert result == [name_data] * 4, f"Unexpected batch result: {result}"
+    assert len(responses.calls) == 1, f"Expected 1 API call, got {len(responses.calls)}"
+
+
+@responses.activate
+def test_fetch_multiple_locations():
+    """
+    Test fetching a batch of mixed city/state and ZIP code inputs.
+
+    Ensures that:
+    - Results are returned in the same order as the inputs.
+    - Duplicate locations are fetched from the API only once.
+    """
+    name_data = [{"lat": 41.8781, "lon": -87.6298, "name": "Chicago", "state": "IL", "country": "US"}]
+    zip_data = {"zip": "53703", "lat": 43.0731, "lon": -89.4012, "name": "Madison", "country": "US"}
+    responses.add(responses.GET, DIRECT_URL, json=name_data, status=200)
+    responses.add(responses.GET, ZIP_URL, json=zip_data, status=200)
+
+    result = fetch_many(["53703", "Chicago, IL", "53703"])
+    assert result == [zip_data, name_data, zip_data], f"Unexpected batch result: {result}"
+    assert len(responses.calls) == 2, f"Expected 2 API calls, got {len(responses.calls)}"
+
+
+@responses.activate
+def test_fetch_multiple_locations_with_invalid_location():
+    """
+    Test that one failing location in a batch does not prevent the others from being returned.
+
+    Ensures that:
+    - Valid locations still return their data.
+    - The failing location's entry is an error dictionary rather than a raised exception.
+    """
+    name_data = [{"lat": 43.0731, "lon": -89.4012, "name": "Madison", "state": "WI", "country": "US"}]
+    responses.add(responses.GET, DIRECT_URL, json=name_data, status=200)
+
+    result = fetch_many(["Madison, WI", "1234"])
+    assert result[0] == name_data, f"Unexpected result for valid location: {result[0]}"
+    assert "error" in result[1], f"Expected an error entry for invalid ZIP, got {result[1]}"
+    assert "1234" in result[1]["error"]
+
+
+@responses.activate
+def test_main_reports_failed_lookup(monkeypatch, capsys):
+    """
+    Test that the CLI writes the full JSON report even when one lookup fails.
+
+    Ensures that:
+    - Every input location appears in the report, in input order.
+    - The failing location is reported with an error entry.
+    """
+    name_data = [{"lat": 43.0731, "lon": -89.4012, "name": "Madison", "state": "WI", "country": "US"}]
+    responses.add(responses.GET, DIRECT_URL, json=name_data, status=200)
+    monkeypatch.setattr(sys, "argv", ["geoloc_util.py", "--locations", "Madison, WI", "1234"])
+
+    geoloc_util.main()
+
+    report = json.loads(capsys.readouterr().out)
+    assert [entry["location"] for entry in report] == ["Madison, WI", "1234"]
+    assert report[0]["data"] == name_data
+    assert "error" in report[1]["data"], f"Expected an error entry, got {report[1]}"
+
+
+@responses.activate
+def test_fetch_coordinates_by_zip_retries_server_error():
+    """
+    Test that a transient server error is retried and the retried response is returned.
+    """
+    zip_data = {"zip": "53703", "lat": 43.0731, "lon": -89.4012, "name": "Madison", "country": "US"}
+    responses.add(responses.GET, ZIP_URL, status=503)
+    responses.add(responses.GET, ZIP_URL, json=zip_data, status=200)
+
+    result = fetch_coordinates_by_zip("53703")
+    assert result == zip_data, f"Expected {zip_data}, but got {result}"
+    assert len(responses.calls) == 2, f"Expected 2 API calls, got {len(responses.calls)}"
+
+
+def test_session_does_not_retry_timeouts():
+    """
+    Test that the session retries only error statuses, not connection failures or timeouts.
+
+    Ensures that a stalled endpoint fails after a single timeout instead of several.
+    """
+    retry = _SESSION.get_adapter(DIRECT_URL).max_retries
+    assert retry.connect == 0 and retry.read == 0, f"Unexpected retry policy: {retry!r}"
+    assert 503 in retry.status_forcelist
+
+
+@responses.activate
+def test_fetch_coordinates_by_name_query_params(monkeypatch):
+    """
+    Test the query parameters sent for a city/state lookup.
+
+    Ensures that:
+    - The location is URL-encoded exactly once (not double-encoded).
+    - The result limit is sent with every city/state lookup.
+    - The API key is attached from the session.
+    """
+    monkeypatch.setitem(_SESSION.params, "appid", "test-key")
+    responses.add(
+        responses.GET,
+        DIRECT_URL,
+        json=[{"lat": 43.0731, "lon": -89.4012, "name": "Madison", "state": "WI", "country": "US"}],
+        status=200,
+        match=[
+            responses.matchers.query_param_matcher(
+                {"q": "madison, wi", "limit": "5", "appid": "test-key"}
+            )
+        ],
+    )
+    fetch_coordinates_by_name("Madison, WI")
+    assert "q=madison%2C+wi" in responses.calls[0].request.url
+
+
+@responses.activate
+def test_fetch_coordinates_by_zip_query_params(monkeypatch):
+    """
+    Test that ZIP code lookups send only the ZIP code plus the session-level API key.
+    """
+    monkeypatch.setitem(_SESSION.params, "appid", "test-key")
+    responses.add(
+        responses.GET,
+        ZIP_URL,
+        json={"zip": "53703", "lat": 43.0731, "lon": -89.4012, "name": "Madison", "country": "US"},
+        status=200,
+        match=[responses.matchers.query_param_matcher({"zip": "53703", "appid": "test-key"})],
+    )
+    result = fetch_coordinates_by_zip("53703")
+    assert result["zip"] == "53703", f"Unexpected result: {result}"
+
+
+@responses.activate
+def test_fetch_coordinates_unauthorized():
+    """
+    Test that a rejected API key (HTTP 401) raises a RuntimeError for both lookup types.
+    """
+    responses.add(responses.GET, DIRECT_URL, status=401)
+    responses.add(responses.GET, ZIP_URL, status=401)
+
+    with pytest.raises(RuntimeError, match="Unauthorized"):
+        fetch_coordinates_by_name("Madison, WI")
+    with pytest.raises(RuntimeError, match="Unauthorized"):
+        fetch_coordinates_by_zip("53703")
+
+
+@responses.activate
+def test_fetch_coordinates_unhandled_status(monkeypatch):
+    """
+    Test that an HTTP error status without a specific handler raises a generic RuntimeError.
+
+    Ensures that:
+    - A server error that persists after retries is reported for both lookup types.
+    """
+    monkeypatch.setattr("urllib3.util.retry.time.sleep", lambda seconds: None)  # Skip retry backoff
+    responses.add(responses.GET, DIRECT_URL, status=500)
+    responses.add(responses.GET, ZIP_URL, status=500)
+
+    with pytest.raises(RuntimeError, match="HTTP error occurred"):
+        fetch_coordinates_by_name("Madison, WI")
+    with pytest.raises(RuntimeError, match="HTTP error occurred"):
+        fetch_coordinates_by_zip("53703")
+
+
+def test_json_parsing_falls_back_without_orjson(monkeypatch):
+    """
+    Test that API responses are still parsed with the standard library when orjson is missing.
+
+    Loads a separate copy of `api_client` with orjson blocked, leaving the shared module untouched.
+    """
+    monkeypatch.setitem(sys.modules, "orjson", None)  # Make `import orjson` raise ImportError
+    spec = importlib.util.spec_from_file_location(
+        "api_client_without_orjson", os.path.join(os.path.dirname(__file__), "../src/api_client.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    assert module._json_loads is json.loads
+
+    zip_data = {"zip": "53703", "lat": 43.0731, "lon": -89.4012, "name": "Madison", "country": "US"}
+    with responses.RequestsMock() as mock:
+        mock.add(responses.GET, module.ZIP_URL, json=zip_data, status=200)
+        assert module.fetch_coordinates_by_zip("53703") == zip_data